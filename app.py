@@ -1,53 +1,190 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session, send_from_directory
-import os, sqlite3
+from flask import Flask, Request, render_template, request, redirect, url_for, session, send_from_directory, Response, make_response, jsonify
+import os, sqlite3, queue, io, csv, zipfile, mimetypes, time, threading, re, tempfile, hashlib, gzip
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cache, wraps
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
+from PIL import Image, ImageOps
 
 # === App setup ===
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'
 UPLOAD_FOLDER = 'uploads'
-# Clean and recreate uploads folder safely
-if os.path.exists('uploads') and not os.path.isdir('uploads'):
-    os.remove('uploads')  # Delete file blocking the folder name
-if not os.path.isdir('uploads'):
-    os.makedirs('uploads')
-try:
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-except FileExistsError:
-    pass  # Ignore if folder already exists
+ALLOWED_EXT = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+UPLOAD_MAX_AGE = 31536000  # one year
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# static files are cache-busted by a ?v= content digest, so browsers can keep them for a year
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+app.config['MAX_CONTENT_LENGTH'] = 8 * 1024 * 1024  # largest photo we accept
+# incoming photos are spooled here (same filesystem, not reachable via /uploads/<filename>)
+UPLOAD_SPOOL = os.path.abspath(os.path.join(UPLOAD_FOLDER, '.spool'))
+os.makedirs(UPLOAD_SPOOL, exist_ok=True)  # also creates UPLOAD_FOLDER
+# a worker killed mid-upload leaves its .part behind; anything this old is not in flight
+# (other workers may be importing the app right now, so the folder is not simply emptied)
+for _entry in os.scandir(UPLOAD_SPOOL):
+    try:
+        if time.time() - _entry.stat().st_mtime > 3600:
+            os.remove(_entry.path)
+    except OSError:
+        pass
+# spool files are created 0600; stored photos get the usual mode so a web server can read them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+PHOTO_MODE = 0o644 & ~_UMASK
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Stream every file part straight to disk instead of Werkzeug's in-memory spool,
+        # so memory stays flat per upload and _save_upload can hard-link it into place.
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_SPOOL, suffix='.part')
+
+app.request_class = UploadRequest
+
+# Behind Apache/lighttpd, let the web server send photo bytes (X-Sendfile).
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+# Behind nginx, point this at an `internal` location aliased to the uploads folder,
+# e.g. X_ACCEL_PREFIX=/_uploads/ with `location /_uploads/ { internal; alias /srv/app/uploads/; }`
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX')
 
 DB_NAME = 'alumni.db'
+# scrypt runs in OpenSSL's C code; lower N (e.g. scrypt:16384:8:1) if logins are too slow.
+# check_password_hash reads the method from each stored hash, so old pbkdf2 hashes keep working.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+POOL_SIZE = 5
+PAGE_SIZE = 50
+
+# === Database connection pool ===
+def _connect():
+    # timeout= is SQLite's busy_timeout: wait up to 5 s for a writer's lock instead of failing
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, timeout=5.0)
+    conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL; no fsync on every commit
+    conn.execute("PRAGMA cache_size=-20000")  # 20 MiB page cache instead of 2 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+_pool = None
+_pool_lock = threading.Lock()
+_initialized = False
+
+def _get_pool():
+    # built on first use, so importing the app (gunicorn --preload) opens no connections
+    global _pool, _initialized
+    pool = _pool
+    if pool is None:
+        with _pool_lock:
+            if _pool is None:
+                conns = [_connect() for _ in range(POOL_SIZE)]
+                if not _initialized:
+                    try:
+                        init_db(conns[0])
+                    except Exception:
+                        for conn in conns:
+                            conn.close()
+                        raise
+                    _initialized = True
+                _pool = queue.Queue(maxsize=POOL_SIZE)
+                for conn in conns:
+                    _pool.put(conn)
+            pool = _pool
+    return pool
+
+def _close_pool():
+    # SQLite connections must not be shared across fork(); the next get_db_conn() reopens
+    global _pool
+    pool, _pool = _pool, None
+    while pool is not None and not pool.empty():
+        pool.get_nowait().close()
+
+os.register_at_fork(before=_close_pool)
+
+@contextmanager
+def get_db_conn():
+    pool = _get_pool()
+    conn = pool.get()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()  # never hand a half-done transaction back to the pool
+        raise
+    finally:
+        pool.put(conn)
+
+_write_lock = threading.Lock()
+
+@contextmanager
+def write_tx():
+    # SQLite allows one writer at a time; threads queue here instead of spinning on the busy timeout
+    with _write_lock, get_db_conn() as conn:
+        # take the write lock up front: under WAL a deferred transaction that reads first can
+        # hit SQLITE_BUSY when it upgrades, while IMMEDIATE just waits out busy_timeout
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()  # get_db_conn() rolls back if the block raised
 
 # === Database setup ===
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS students (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    fullname TEXT,
-                    school TEXT,
-                    phone TEXT,
-                    photo TEXT
-                )''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS admin (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE,
-                    password TEXT
-                )''')
-
-    # create default admin if not exist
-    c.execute("SELECT * FROM admin WHERE username=?", ('admin',))
-    if not c.fetchone():
-        c.execute("INSERT INTO admin (username, password) VALUES (?, ?)",
-                  ('admin', generate_password_hash('1234')))
-    conn.commit()
-    conn.close()
-
-init_db()
+def init_db(conn):
+    conn.execute("PRAGMA journal_mode=WAL")  # stored in the db file, so once is enough
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name='students_fts'").fetchone()
+
+    # One script in one transaction: the DDL is parsed in a single call and the whole
+    # schema, backfill and seed land with a single commit. The script leaves the
+    # transaction open for the statements below.
+    try:
+        conn.executescript('''
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS students (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fullname TEXT,
+                school TEXT,
+                phone TEXT,
+                photo TEXT
+            );
+            CREATE TABLE IF NOT EXISTS admin (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE,
+                password TEXT
+            );
+            -- covers the dashboard listing: its sort order plus every column it selects
+            CREATE INDEX IF NOT EXISTS idx_students_listing
+                ON students(fullname COLLATE NOCASE, id, school, phone, photo);
+            DROP INDEX IF EXISTS idx_students_fullname;
+
+            -- full-text index over name and school, kept in sync with students by triggers
+            CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+                fullname, school, content='students', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            );
+            CREATE TRIGGER IF NOT EXISTS students_fts_ai AFTER INSERT ON students BEGIN
+                INSERT INTO students_fts(rowid, fullname, school) VALUES (new.id, new.fullname, new.school);
+            END;
+            CREATE TRIGGER IF NOT EXISTS students_fts_ad AFTER DELETE ON students BEGIN
+                INSERT INTO students_fts(students_fts, rowid, fullname, school)
+                    VALUES ('delete', old.id, old.fullname, old.school);
+            END;
+            CREATE TRIGGER IF NOT EXISTS students_fts_au AFTER UPDATE ON students BEGIN
+                INSERT INTO students_fts(students_fts, rowid, fullname, school)
+                    VALUES ('delete', old.id, old.fullname, old.school);
+                INSERT INTO students_fts(rowid, fullname, school) VALUES (new.id, new.fullname, new.school);
+            END;
+        ''')
+
+        if not has_fts:  # index the students that existed before the FTS table
+            conn.execute("INSERT INTO students_fts(students_fts) VALUES ('rebuild')")
+
+        # create default admin if not exist
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM admin WHERE username=?", ('admin',))
+        if not c.fetchone():
+            c.execute("INSERT INTO admin (username, password) VALUES (?, ?)",
+                      ('admin', generate_password_hash('1234', method=PASSWORD_HASH_METHOD, salt_length=16)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 # === HTML Template ===
 TEMPLATE = """
@@ -55,79 +192,18 @@ TEMPLATE = """
 <html>
 <head>
     <title>🎓 Alumni Dashboard</title>
-    <style>
-        body {
-            font-family: Arial;
-            background-color: #d2b48c;
-            margin: 0;
-            padding: 0;
-        }
-        .container {
-            width: 90%%;
-            margin: 20px auto;
-        }
-        .header {
-            background: #8b5e3c;
-            color: white;
-            padding: 15px;
-            border-radius: 10px;
-        }
-        .card {
-            background: white;
-            padding: 15px;
-            margin: 10px;
-            border-radius: 10px;
-            box-shadow: 0 0 5px rgba(0,0,0,0.3);
-            display: inline-block;
-            width: 220px;
-            text-align: center;
-            vertical-align: top;
-        }
-        img {
-            width: 100px;
-            height: 100px;
-            border-radius: 50%%;
-            object-fit: cover;
-        }
-        .search-bar {
-            margin: 15px 0;
-        }
-        input[type="text"], input[type="password"], input[type="file"] {
-            padding: 8px;
-            border-radius: 5px;
-            border: 1px solid #aaa;
-            width: 200px;
-        }
-        button {
-            background: #8b5e3c;
-            color: white;
-            border: none;
-            padding: 8px 15px;
-            border-radius: 5px;
-            cursor: pointer;
-        }
-        a {
-            color: white;
-            text-decoration: none;
-        }
-        .login-section, .register-section {
-            margin-top: 30px;
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('static', filename='app.css', v=css_version) }}">
 </head>
 <body>
 <div class="container">
     <div class="header">
         <h1>🎓 Alumni Dashboard</h1>
         {% if 'username' in session %}
-            <p>Welcome, {{ session['username'] }} | <a href="{{ url_for('logout') }}">Logout</a></p>
+            <p>Welcome, {{ session['username'] }} | <a href="{{ url_for('download_zip') }}">Export</a> (<a href="{{ url_for('download_csv') }}">CSV only</a>) | <a href="{{ url_for('logout') }}">Logout</a></p>
         {% endif %}
     </div>
 
-    {% if not session.get('username') %}
+    {% if not is_admin %}
         <div class="login-section">
             <h2>Login as Admin</h2>
             <form method="POST" action="{{ url_for('login') }}">
@@ -143,7 +219,7 @@ TEMPLATE = """
                 <input type="text" name="fullname" placeholder="Full Name" required><br><br>
                 <input type="text" name="school" placeholder="School Name" required><br><br>
                 <input type="text" name="phone" placeholder="Phone Number" required><br><br>
-                <input type="file" name="photo" required><br><br>
+                <input type="file" name="photo" accept="image/*" required><br><br>
                 <button type="submit">Register</button>
             </form>
         </div>
@@ -157,49 +233,361 @@ TEMPLATE = """
 
         <div>
         {% for s in students %}
-            {% if not request.args.get('q') or request.args.get('q').lower() in s['fullname'].lower() or request.args.get('q').lower() in s['school'].lower() %}
-                <div class="card">
-                    <img src="{{ url_for('uploaded_file', filename=s['photo']) }}" alt="photo">
-                    <h3>{{ s['fullname'] }}</h3>
-                    <p><b>School:</b> {{ s['school'] }}</p>
-                    <p><b>Phone:</b> {{ s['phone'] }}</p>
-                </div>
-            {% endif %}
+            <div class="card">
+                {% if s['photo'] %}
+                <img src="{{ url_for('uploaded_file', filename=thumb_name(s['photo'])) }}"
+                     onerror="this.onerror=null; this.src='{{ url_for('uploaded_file', filename=s['photo']) }}'"
+                     width="100" height="100" loading="lazy" decoding="async" alt="photo">
+                {% endif %}
+                <h3>{{ s['fullname'] }}</h3>
+                <p><b>School:</b> {{ s['school'] }}</p>
+                <p><b>Phone:</b> {{ s['phone'] }}</p>
+            </div>
         {% endfor %}
         </div>
+
+        {% if next_page %}
+        <div class="pager">
+            <a href="{{ url_for('home', q=request.args.get('q', ''), **next_page) }}">Next page &raquo;</a>
+        </div>
+        {% endif %}
     {% endif %}
 </div>
 </body>
 </html>
 """
+with app.open_resource('static/app.css', 'rb') as f:
+    app.jinja_env.globals['css_version'] = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+# Compile once; render_template_string would re-parse TEMPLATE on every request
+COMPILED_TEMPLATE = app.jinja_env.from_string(TEMPLATE)
+_TEMPLATE_DIGEST = hashlib.blake2b((TEMPLATE + app.jinja_env.globals['css_version']).encode(),
+                                   digest_size=8).hexdigest()  # part of the page ETag
+
+# === Photo processing ===
+PHOTO_MAX_SIZE = (800, 800)  # larger photos also get a .small copy of this size, for the export
+THUMB_SIZE = (200, 200)  # 2x the 100px avatar, for high-DPI screens
+PHOTO_MAX_PIXELS = 64_000_000  # covers 48/50 MP phone cameras; larger images are not processed
+_photo_executor = ThreadPoolExecutor(max_workers=2)
+
+def thumb_name(photo):
+    return photo.rpartition('.')[0] + '.thumb.jpg'
+
+def small_name(photo):
+    stem, _, ext = photo.rpartition('.')
+    return f"{stem}.small.{ext}"
+
+def _process_photo(path):
+    # The dashboard falls back to the original until (or unless) the thumbnail exists.
+    # Any anonymous upload lands here, so the full-size image is never copied.
+    try:
+        folder, photo = os.path.split(path)
+        with Image.open(path) as img:
+            fmt = img.format
+            if img.width * img.height > PHOTO_MAX_PIXELS:
+                raise ValueError(f"{img.width}x{img.height} is over the pixel cap")
+            icc, exif = img.info.get('icc_profile'), img.getexif()
+            shrink = max(img.size) > max(PHOTO_MAX_SIZE)
+            if fmt == 'JPEG':
+                img.draft('RGB', PHOTO_MAX_SIZE)  # libjpeg decodes at 1/2-1/8 scale when it can
+            img.thumbnail(PHOTO_MAX_SIZE)  # in place, so the decode is the only big buffer
+            small = ImageOps.exif_transpose(img)
+            exif.pop(0x0112, None)  # orientation: the pixels are upright now
+            # GIFs are left alone so animations survive
+            if shrink and fmt in ('JPEG', 'PNG', 'WEBP'):
+                # the upload is kept as is; the export ships this smaller copy instead
+                tmp = os.path.join(folder, small_name(photo)) + '.tmp'
+                # keep the colour profile (e.g. Display P3) and camera metadata
+                meta = {'icc_profile': icc, 'exif': exif.tobytes()}
+                if fmt == 'JPEG':
+                    small.convert('RGB').save(tmp, fmt, quality=85, optimize=True, progressive=True, **meta)
+                else:
+                    small.save(tmp, fmt, optimize=True, **meta)
+                os.replace(tmp, os.path.join(folder, small_name(photo)))  # never half a file
+            thumb = small.convert('RGB')
+            thumb.thumbnail(THUMB_SIZE)
+            # served as immutable, so a reader must never catch it half-written either
+            tmp = os.path.join(folder, thumb_name(photo)) + '.tmp'
+            thumb.save(tmp, 'JPEG', quality=80, optimize=True, icc_profile=icc)
+            os.replace(tmp, os.path.join(folder, thumb_name(photo)))
+    except Exception as e:  # corrupt or unsupported image; PIL raises more than OSError
+        app.logger.warning("Could not process photo %s: %s", path, e)
+
+# === Uploads ===
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+def _save_upload(photo):
+    # returns the stored filename, or None if the upload is not an allowed image
+    _, dot, ext = secure_filename(photo.filename).rpartition('.')
+    ext = ext.lower()
+    if not dot or ext not in ALLOWED_EXT:
+        return None
+
+    # content-addressed: the same photo uploaded twice is stored (and exported) once
+    stream = photo.stream
+    stream.seek(0)
+    digest = hashlib.blake2b(digest_size=16)
+    while chunk := stream.read(UPLOAD_COPY_BUFFER):
+        digest.update(chunk)
+    filename = f"{digest.hexdigest()}.{ext}"
+    dest = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if os.path.exists(dest):
+        if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], thumb_name(filename))):
+            # the first job failed or died with its worker; a re-upload gets another go
+            _photo_executor.submit(_process_photo, dest)
+        return filename
+
+    try:
+        # already on disk in UPLOAD_SPOOL (see UploadRequest): link it, no second write
+        if os.path.dirname(getattr(stream, 'name', '')) != UPLOAD_SPOOL:
+            raise OSError("upload was not spooled to disk")
+        stream.flush()
+        os.chmod(stream.name, PHOTO_MODE)  # the link shares the spool file's inode
+        os.link(stream.name, dest)
+    except FileExistsError:
+        return filename  # an identical upload won the race
+    except OSError:
+        stream.seek(0)
+        photo.save(dest, buffer_size=UPLOAD_COPY_BUFFER)
+    _photo_executor.submit(_process_photo, dest)  # resize off the request thread
+    return filename
+
+# === Export ===
+EXPORT_CHUNK_SIZE = 1024 * 1024  # per read and per yielded chunk; fewer generator round-trips
+PRECOMPRESSED_EXT = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+EXPORT_CSV_HEADER = ['id', 'fullname', 'school', 'phone', 'photo']  # SQL_EXPORT_STUDENTS columns
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_safe(rows):
+    # names, schools and phones come from the public register form; a cell starting with
+    # = + - @ would run as a formula when the export is opened in a spreadsheet
+    for row in rows:
+        yield tuple("'" + v if isinstance(v, str) and v.startswith(FORMULA_PREFIXES) else v for v in row)
+
+class _StreamBuffer:
+    # write-only sink for ZipFile; drain() hands back what was written so far
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+def _zip_export(rows):
+    folder = app.config['UPLOAD_FOLDER']
+    # one directory scan instead of a stat() per student
+    available = {e.name for e in os.scandir(folder) if e.is_file()}
+    csv_buf = io.StringIO()
+    writer = csv.writer(csv_buf)
+    writer.writerow(EXPORT_CSV_HEADER)
+    writer.writerows(_csv_safe(rows))
+
+    buf = _StreamBuffer()
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        # uploads are content-addressed, so students sharing a photo share one entry
+        for photo in dict.fromkeys(r[4] for r in rows if r[4] in available):
+            # oversized uploads ship as their 800px copy, under the name the CSV refers to
+            path = os.path.join(folder, small_name(photo) if small_name(photo) in available else photo)
+            info = zipfile.ZipInfo.from_file(path, 'photos/' + photo)
+            if photo.rpartition('.')[2].lower() in PRECOMPRESSED_EXT:
+                info.compress_type = zipfile.ZIP_STORED  # deflate would burn CPU for ~0% gain
+            with open(path, 'rb') as src, zf.open(info, 'w') as dest:
+                while chunk := src.read(EXPORT_CHUNK_SIZE):
+                    dest.write(chunk)
+                    yield from buf.drain()
+            yield from buf.drain()
+
+        # the CSV is small text, so it is kept in memory and written after the photos
+        zf.writestr('alumni.csv', csv_buf.getvalue())
+    yield from buf.drain()
+
+CSV_BATCH_ROWS = 1000  # rows per yielded chunk
+
+def _csv_export(rows):
+    # the CSV alone, sent as it is written: no archive, no photos
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_CSV_HEADER)
+    yield buf.getvalue()
+    for i in range(0, len(rows), CSV_BATCH_ROWS):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(_csv_safe(rows[i:i + CSV_BATCH_ROWS]))
+        yield buf.getvalue()
+
+# === Auth helpers ===
+@cache
+def _password_hash_prefix():
+    # the method as Werkzeug writes it into a hash, defaults filled in ('scrypt' -> 'scrypt:32768:8:1');
+    # costs one hash, so it is paid on the first login rather than at every process start
+    return generate_password_hash('', method=PASSWORD_HASH_METHOD).split('$', 1)[0]
+
+def current_user_is_admin():
+    # set once at login, so no admin lookup is needed per request
+    if 'is_admin' not in session and 'username' in session:
+        # session from before the flag existed: look it up once and remember it
+        with get_db_conn() as conn:
+            row = conn.execute(SQL_IS_ADMIN, (session['username'],)).fetchone()
+        session['is_admin'] = row is not None
+    return bool(session.get('is_admin'))
+
+def admin_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user_is_admin():
+            return "Admin login required", 401
+        return view(*args, **kwargs)
+    return wrapper
+
+# === Queries ===
+# Hot statements live here so every call passes sqlite3 the same text (its statement cache key)
+SQL_INSERT_STUDENT = "INSERT INTO students (fullname, school, phone, photo) VALUES (?, ?, ?, ?)"
+SQL_EXPORT_STUDENTS = "SELECT id, fullname, school, phone, photo FROM students ORDER BY id"
+SQL_GET_ADMIN_PASSWORD = "SELECT password FROM admin WHERE username=?"
+SQL_IS_ADMIN = "SELECT 1 FROM admin WHERE username=?"
+SQL_SET_ADMIN_PASSWORD = "UPDATE admin SET password=? WHERE username=?"
+
+def _fts_query(q):
+    # every word must match the start of a word in the name or school: "ali gss" -> "ali"* "gss"*
+    return ' '.join('"%s"*' % w for w in re.findall(r'\w+', q))
+
+def search_students(q='', after=None, limit=None):
+    # keyset pagination: `after` is the (fullname, id) of the last row already shown
+    sql = "SELECT id, fullname, school, phone, photo FROM students"
+    where, params = [], []
+    if q:
+        where.append("id IN (SELECT rowid FROM students_fts WHERE students_fts MATCH ?)")
+        params.append(_fts_query(q) or '""')  # punctuation-only input matches nothing
+    if after:
+        # spelled out rather than as a row value so SQLite can seek on the index
+        where.append("fullname >= ? COLLATE NOCASE AND (fullname > ? COLLATE NOCASE OR id > ?)")
+        params += [after[0], after[0], after[1]]
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY fullname COLLATE NOCASE, id"  # walks idx_students_listing, no sort step
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with get_db_conn() as conn:
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row  # built in C and indexable by name in the template
+        c.execute(sql, params)
+        return c.fetchall()
+
+# Listing cache: admins browse far more than alumni register. The TTL bounds how long
+# another worker process can serve rows from before a write it did not see.
+LIST_CACHE_TTL = 30
+LIST_CACHE_MAX = 256
+_list_cache = {}
+_list_cache_version = 0
+_list_cache_lock = threading.Lock()
+
+def cached_search_students(q='', after=None, limit=None):
+    key = (q, after, limit)
+    now = time.monotonic()
+    with _list_cache_lock:
+        hit = _list_cache.get(key)
+        if hit and now - hit[0] < LIST_CACHE_TTL:
+            return hit[1]
+        version = _list_cache_version
+    rows = search_students(q, after, limit)
+    with _list_cache_lock:
+        if version == _list_cache_version:  # skip if a write landed while we queried
+            if len(_list_cache) >= LIST_CACHE_MAX:
+                _list_cache.clear()
+            _list_cache[key] = (now, rows)
+    return rows
+
+def invalidate_student_cache():
+    global _list_cache_version
+    with _list_cache_lock:
+        _list_cache_version += 1
+        _list_cache.clear()
+
+def _listing_etag(rows):
+    # hashed from the rows this worker is about to render, so the tag can never vouch for
+    # rows its cache has not caught up with; the query string covers the search and page
+    h = hashlib.blake2b(f"{_TEMPLATE_DIGEST}:{session.get('username')}:{request.query_string.decode()}".encode(),
+                        digest_size=8)
+    for row in rows:
+        h.update(repr(tuple(row)).encode())
+    return h.hexdigest()
+
+# === Compression ===
+COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+COMPRESS_MIN_SIZE = 500  # below this the gzip header eats the saving
+
+@app.after_request
+def gzip_response(resp):
+    # Pages and JSON compress ~5x; level 1 gets most of that for very little CPU.
+    # Streamed and file responses (the ZIP export, photos, CSS) are left alone.
+    if (resp.mimetype not in COMPRESS_MIMETYPES or resp.direct_passthrough or resp.is_streamed
+            or 'Content-Encoding' in resp.headers):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:  # quality 0 for "gzip;q=0", i.e. refused
+        return resp
+    body = resp.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return resp
+    resp.set_data(gzip.compress(body, compresslevel=1))
+    resp.headers['Content-Encoding'] = 'gzip'
+    etag, weak = resp.get_etag()
+    if etag and not weak:  # same content, different bytes
+        resp.set_etag(etag, weak=True)
+    return resp
 
 # === Routes ===
 @app.route('/')
 def home():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT fullname, school, phone, photo FROM students")
-    rows = c.fetchall()
-    conn.close()
-    students = [{'fullname': r[0], 'school': r[1], 'phone': r[2], 'photo': r[3]} for r in rows]
-    return render_template_string(TEMPLATE, students=students)
+    if not current_user_is_admin():  # visitors only see the login/register forms
+        return render_template(COMPILED_TEMPLATE, students=[], is_admin=False)
+
+    after, next_page = None, None
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        after = (request.args.get('after_name', ''), after_id)
+    # one extra row tells us whether there is a next page
+    rows = cached_search_students(request.args.get('q', '').strip(), after, PAGE_SIZE + 1)
+
+    # an unchanged dashboard costs the browser a 304 instead of a render
+    etag = _listing_etag(rows)
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        if len(rows) > PAGE_SIZE:
+            rows = rows[:PAGE_SIZE]
+            next_page = {'after_name': rows[-1]['fullname'], 'after_id': rows[-1]['id']}
+        resp = make_response(render_template(COMPILED_TEMPLATE, students=rows, is_admin=True,
+                                             next_page=next_page, thumb_name=thumb_name))
+    # weak, whether or not the body ends up gzipped, so a 304 repeats the 200's exact tag
+    resp.set_etag(etag, weak=True)
+    resp.cache_control.private = True
+    resp.cache_control.max_age = 0
+    return resp
 
 @app.route('/register', methods=['POST'])
 def register():
-    fullname = request.form['fullname']
-    school = request.form['school']
-    phone = request.form['phone']
-    photo = request.files['photo']
+    # parse the form once; a missing or blank field is a 400, checked before the photo is touched
+    form = request.form
+    fullname, school, phone = (form.get(k, '').strip() for k in ('fullname', 'school', 'phone'))
+    photo = request.files.get('photo')
+    if not (fullname and school and phone and photo):
+        return "Full name, school, phone and photo are all required", 400
 
-    filename = secure_filename(photo.filename)
-    photo.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    filename = _save_upload(photo)
+    if filename is None:
+        return "Photo must be a PNG, JPG, GIF or WebP image", 400
 
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("INSERT INTO students (fullname, school, phone, photo) VALUES (?, ?, ?, ?)",
-              (fullname, school, phone, filename))
-    conn.commit()
-    conn.close()
+    with write_tx() as conn:
+        conn.execute(SQL_INSERT_STUDENT, (fullname, school, phone, filename))
+    invalidate_student_cache()
 
     return redirect(url_for('home'))
 
@@ -208,27 +596,88 @@ def login():
     username = request.form['username']
     password = request.form['password']
 
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("SELECT password FROM admin WHERE username=?", (username,))
-    user = c.fetchone()
-    conn.close()
+    with get_db_conn() as conn:
+        c = conn.cursor()
+        c.execute(SQL_GET_ADMIN_PASSWORD, (username,))
+        user = c.fetchone()
 
     if user and check_password_hash(user[0], password):
+        if user[0].split('$', 1)[0] != _password_hash_prefix():
+            # stored with an older/costlier method: upgrade while we have the plain password
+            with write_tx() as conn:
+                conn.execute(SQL_SET_ADMIN_PASSWORD,
+                             (generate_password_hash(password, method=PASSWORD_HASH_METHOD, salt_length=16),
+                              username))
         session['username'] = username
+        session['is_admin'] = True  # every row in the admin table is an admin
         return redirect(url_for('home'))
     else:
         return "Invalid username or password", 401
 
 @app.route('/logout')
 def logout():
-    session.pop('username', None)
+    session.clear()
     return redirect(url_for('home'))
 
+@app.route('/api/students/bulk', methods=['POST'])
+@admin_required
+def bulk_import():
+    # JSON array of {"fullname", "school", "phone"} objects, e.g. an old register being digitised
+    records = request.get_json(silent=True)
+    if not isinstance(records, list):
+        return jsonify(error="Expected a JSON array of students"), 400
+    rows = []
+    for i, rec in enumerate(records):
+        values = [rec.get(k) for k in ('fullname', 'school', 'phone')] if isinstance(rec, dict) else []
+        values = [v.strip() for v in values if isinstance(v, str)]  # numbers, lists etc. are rejected
+        if len(values) != 3 or not all(values):
+            return jsonify(error=f"Record {i} needs fullname, school and phone as non-empty strings"), 400
+        rows.append((*values, None))  # no photo yet
+
+    # one transaction for the whole batch: one commit instead of one per student
+    with write_tx() as conn:
+        conn.executemany(SQL_INSERT_STUDENT, rows)
+    invalidate_student_cache()
+    return jsonify(inserted=len(rows)), 201
+
+@app.route('/download')
+@admin_required
+def download_zip():
+    with get_db_conn() as conn:
+        c = conn.cursor()
+        c.execute(SQL_EXPORT_STUDENTS)
+        rows = c.fetchall()
+
+    # the archive is built while it is sent, so memory stays flat however many photos there are
+    return Response(_zip_export(rows), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=alumni_export.zip'})
+
+@app.route('/download.csv')
+@admin_required
+def download_csv():
+    with get_db_conn() as conn:
+        rows = conn.execute(SQL_EXPORT_STUDENTS).fetchall()
+
+    return Response(_csv_export(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=alumni.csv'})
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if X_ACCEL_PREFIX:
+        if safe_join(app.config['UPLOAD_FOLDER'], filename) is None:
+            return "Not found", 404
+        resp = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        resp.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX.rstrip('/') + '/' + filename
+    else:
+        resp = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                   conditional=True, max_age=UPLOAD_MAX_AGE)
+    # names are content hashes of the upload, and the .thumb/.small copies derived from it
+    # are written once, atomically, so a name never points at new bytes
+    resp.headers['Cache-Control'] = f'public, max-age={UPLOAD_MAX_AGE}, immutable'
+    return resp
 
 if __name__ == '__main__':
     print("✅ Uploads folder ready. App starting...")
-    app.run(host='0.0.0.0', port=10000, debug=True)
+    # dev server only; production runs `gunicorn -c gunicorn_conf.py app:app` (see Procfile)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 10000)),
+            debug=os.environ.get('FLASK_DEBUG') == '1')
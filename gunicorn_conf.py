@@ -0,0 +1,9 @@
+# Production server settings: gunicorn -c gunicorn_conf.py app:app
+import multiprocessing, os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# threads let one worker keep serving while another request waits on upload/export I/O
+worker_class = 'gthread'
+threads = 4
+keepalive = 5